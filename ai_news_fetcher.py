@@ -1,12 +1,29 @@
 # ai_news_fetcher.py
+import asyncio
+import json
 import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from io import BytesIO
 from typing import Optional
+from urllib.parse import urljoin, urlsplit
 
 import feedparser
-import requests
-from bs4 import BeautifulSoup
+import httpx
+from lxml import etree
+from pybloom_live import ScalableBloomFilter
 from supabase import create_client, Client
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
 
 
 # =========================
@@ -16,6 +33,8 @@ SUPABASE_URL = os.environ["SUPABASE_URL"]
 SUPABASE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Supabase への書き込みはスレッドをまたいで直列化する
+DB_WRITE_LOCK = threading.Lock()
 
 
 # =========================
@@ -46,80 +65,471 @@ FEEDS = [
 ]
 
 
+# =========================
+# 並列取得の設定
+# =========================
+# 同時接続数 / 保持しておくアイドル接続数の上限
+# （HTTP/2 対応ホストには 1 本の接続で多重化してリクエストを送る）
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+# 記事本文を同時に取りに行く数の上限（全体 / 1 ホストあたり）
+MAX_CONCURRENT_ARTICLES = 8
+MAX_CONCURRENT_PER_HOST = 3
+# 1 回の enrich で本文を埋める記事数の上限
+ENRICH_BATCH_SIZE = 200
+# 既存 URL の確認で 1 リクエストに含める URL 数（GET のクエリ長対策）
+EXISTING_URL_CHUNK = 100
+# アイドル接続を使い回す時間（秒）。同一ホストへの TLS ハンドシェイクを省く
+KEEPALIVE_TIMEOUT = 30
+# 1 リクエストあたりのタイムアウト（秒）
+REQUEST_TIMEOUT = 10
+# 一時的なエラーとみなしてリトライするステータスコードと最大試行回数
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_ATTEMPTS = 3
+# フィードのパース / Supabase 呼び出しなどブロッキング処理用のスレッド数
+MAX_WORKERS = 8
+
+HTTP_HEADERS = {
+    # ブロックされにくい程度の User-Agent
+    "User-Agent": "Mozilla/5.0 (compatible; AI-News-Fetcher/1.0)",
+}
+
+# =========================
+# キャッシュ設定
+# =========================
+# 実行をまたいで残すデータの置き場所（GitHub Actions では actions/cache で復元する）
+CACHE_DIR = ".cache"
+# フィード URL -> {"etag": ..., "modified": ...}（条件付き GET 用）
+FEED_STATE_PATH = os.path.join(CACHE_DIR, "feeds.json")
+
+# 保存済み URL の Bloom フィルタ（DB に問い合わせる前のふるい）
+SEEN_FILTER_PATH = os.path.join(CACHE_DIR, "seen.bf")
+# Bloom フィルタの偽陽性率（新規 URL を既存と誤判定してスキップしてしまう確率）
+SEEN_FILTER_ERROR_RATE = 0.001
+
+# =========================
+# 本文抽出の設定
+# =========================
+# HTML をパーサに流し込む単位（バイト）
+STREAM_CHUNK_SIZE = 32 * 1024
+# これ以上は読まない HTML の上限（バイト）。巨大なページでメモリを食い潰さないため
+MAX_HTML_BYTES = 5 * 1024 * 1024
+# 本文テキストから除外するタグ
+NON_CONTENT_TAGS = ("script", "style", "noscript")
+# フィードに埋め込まれた本文をテキスト化するためのパーサ
+HTML_FRAGMENT_PARSER = etree.HTMLParser(remove_comments=True)
+# フィードに埋め込まれた本文がこの文字数を超えていれば、記事ページは取りに行かない
+EMBEDDED_CONTENT_MIN_CHARS = 500
+# class 名が本文っぽい要素（呼び出しごとにコンパイルしないよう事前に用意）
+CONTENT_CLASS_XPATH = etree.XPath(
+    "//*[contains(@class, 'article') or contains(@class, 'content')]"
+)
+
+
 # =========================
 # ユーティリティ
 # =========================
+UTC = timezone.utc
+
+
 def parse_published(entry) -> Optional[datetime]:
     """
     RSS の published / updated から datetime を作る。
     取れなければ None を返す。
     """
-    struct = getattr(entry, "published_parsed", None) or getattr(
-        entry, "updated_parsed", None
-    )
+    struct = entry.get("published_parsed") or entry.get("updated_parsed")
     if struct:
-        return datetime(*struct[:6], tzinfo=timezone.utc)
+        return datetime(*struct[:6], tzinfo=UTC)
     return None
 
 
-def fetch_article_content(url: str) -> Optional[str]:
+def parse_date(text: Optional[str]) -> Optional[time.struct_time]:
     """
-    記事ページの HTML を取得して、本文テキストだけを抜き出す。
-    失敗した場合は None を返す。
+    RSS (RFC 822) / Atom (ISO 8601) の日付文字列を UTC の struct_time にする。
+    feedparser の *_parsed と同じ形で返す。読めなければ None を返す。
     """
+    if not text:
+        return None
+    text = text.strip()
     try:
-        resp = requests.get(
-            url,
-            timeout=10,
-            headers={
-                # ブロックされにくい程度の User-Agent
-                "User-Agent": "Mozilla/5.0 (compatible; AI-News-Fetcher/1.0)",
-            },
+        dt = parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        try:
+            dt = datetime.fromisoformat(text)
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return dt.utctimetuple()
+
+
+def entry_link(elem) -> Optional[str]:
+    """
+    <item> / <entry> から記事 URL を取り出す。
+    RSS は <link> のテキスト、Atom は rel="alternate"（または rel 無し）の href。
+    どちらも無ければ feedparser と同じく permalink の <guid> を使う。
+    """
+    for link in elem.iterfind("{*}link"):
+        href = link.get("href")
+        if href is None:
+            if link.text and link.text.strip():
+                return link.text.strip()
+        elif link.get("rel", "alternate") == "alternate":
+            return href
+    guid = elem.find("{*}guid")
+    if guid is not None and guid.get("isPermaLink", "true").lower() != "false":
+        if guid.text and guid.text.strip():
+            return guid.text.strip()
+    return None
+
+
+def entry_content(elem) -> list:
+    """
+    <content:encoded> (RSS) / <content> (Atom) に入っている本文を
+    feedparser の entry.content と同じ形（[{"value": ...}]）で返す。
+    """
+    value = elem.findtext("{*}encoded") or elem.findtext("{*}content")
+    return [{"value": value}] if value else []
+
+
+def parse_feed_xml(content: bytes, base_url: str = "") -> list:
+    """
+    RSS / Atom の <item> / <entry> だけを iterparse で読み、エントリの dict のリストを返す。
+    キー名は feedparser に合わせる（link / title / summary / *_parsed）。
+    相対 URL の link は base_url（フィードの URL）を基準に絶対 URL にする。
+    """
+    entries = []
+    for _, elem in etree.iterparse(
+        BytesIO(content),
+        events=("end",),
+        tag=("{*}item", "{*}entry"),
+        resolve_entities=False,
+        no_network=True,
+    ):
+        content_list = entry_content(elem)
+        # 要約が無ければ feedparser と同じく本文で埋める
+        summary = elem.findtext("{*}description") or elem.findtext("{*}summary")
+        if not summary and content_list:
+            summary = content_list[0]["value"]
+        link = entry_link(elem)
+        entries.append(
+            {
+                "link": urljoin(base_url, link) if link else None,
+                "title": elem.findtext("{*}title"),
+                "summary": summary,
+                "content": content_list,
+                "published_parsed": parse_date(
+                    elem.findtext("{*}pubDate")
+                    or elem.findtext("{*}published")
+                    or elem.findtext("{*}date")  # dc:date (RSS 1.0)
+                ),
+                "updated_parsed": parse_date(elem.findtext("{*}updated")),
+            }
         )
-        resp.raise_for_status()
-    except Exception as e:
-        print(f"[WARN] fetch_article_content failed: {url} ({e!r})")
+        # 読み終わった要素は捨ててメモリを増やさない
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+    return entries
+
+
+def parse_feed(content: bytes, headers: dict, feed_url: str) -> list:
+    """
+    フィードの XML をエントリのリストにする。
+    壊れた XML などで読めない場合だけ feedparser にフォールバックする。
+    headers には取得時のレスポンスヘッダを渡す（feedparser が文字コード判定に使う）。
+    相対 URL は feed_url を基準に解決する。
+    """
+    try:
+        entries = parse_feed_xml(content, feed_url)
+    except etree.XMLSyntaxError as e:
+        print(f"[WARN] falling back to feedparser ({e!r})")
+        entries = []
+    if entries:
+        return entries
+    # URL ではなく取得済みのバイト列を渡し、feedparser 自身には通信させない
+    # Content-Location が無いときもフィードの URL を基準に相対 URL を解決させる
+    response_headers = {"content-location": feed_url, **headers}
+    return feedparser.parse(content, response_headers=response_headers).get(
+        "entries", []
+    )
+
+
+def load_feed_state() -> dict:
+    """
+    前回実行時に保存したフィードごとの ETag / Last-Modified を読み込む。
+    ファイルが無い・壊れている場合は空の dict を返す。
+    """
+    try:
+        with open(FEED_STATE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_feed_state(state: dict) -> None:
+    """
+    フィードごとの ETag / Last-Modified を保存する。
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(FEED_STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+
+def load_seen_filter() -> ScalableBloomFilter:
+    """
+    前回実行時に保存した URL の Bloom フィルタを読み込む。
+    ファイルが無い・壊れている場合は空のフィルタを返す。
+    """
+    try:
+        with open(SEEN_FILTER_PATH, "rb") as f:
+            return ScalableBloomFilter.fromfile(f)
+    except Exception:
+        return ScalableBloomFilter(
+            error_rate=SEEN_FILTER_ERROR_RATE,
+            mode=ScalableBloomFilter.LARGE_SET_GROWTH,
+        )
+
+
+def save_seen_filter(seen_filter: ScalableBloomFilter) -> None:
+    """
+    URL の Bloom フィルタを保存する。
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(SEEN_FILTER_PATH, "wb") as f:
+        seen_filter.tofile(f)
+
+
+def html_to_text(html: str) -> str:
+    """
+    HTML 断片（フィードに埋め込まれた本文など）をテキストにする。
+    パースできない場合は空文字を返す（本文は後で enrich_bodies が埋める）。
+    """
+    if not html or not html.strip():
+        return ""
+    try:
+        root = etree.fromstring(html, HTML_FRAGMENT_PARSER)
+    except (ValueError, etree.ParserError):
+        # XML 宣言付きの str などは lxml が受け付けない
+        return ""
+    if root is None:
+        return ""
+    etree.strip_elements(root, *NON_CONTENT_TAGS, with_tail=False)
+    return joined_text(root)
+
+
+def joined_text(el) -> str:
+    """
+    要素配下のテキストを改行区切りで連結して返す。
+    """
+    return "\n".join(t.strip() for t in el.itertext() if t.strip())
+
+
+def element_text(el) -> str:
+    """
+    要素配下のテキストを改行区切りで連結して返す（script / style などは除く）。
+    """
+    etree.strip_elements(el, *NON_CONTENT_TAGS, with_tail=False)
+    return joined_text(el)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    429 / 5xx や接続・タイムアウトなど、時間をおけば直りそうなエラーかどうか。
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRY_STATUSES
+    return isinstance(exc, httpx.TransportError)
+
+
+def retrying() -> AsyncRetrying:
+    """
+    フィード・記事の取得で共通に使う、ジッター付き指数バックオフのリトライ設定。
+    """
+    return AsyncRetrying(
+        retry=retry_if_exception(is_retryable),
+        wait=wait_exponential_jitter(initial=0.5),
+        stop=stop_after_attempt(RETRY_ATTEMPTS),
+        reraise=True,
+    )
+
+
+def is_nested_candidate(el) -> bool:
+    """
+    同じタグの候補（<article> の中の <article> など）の中にあるかどうか。
+    関連記事カードなどを本文と取り違えないよう、外側の候補だけを見るために使う。
+    <main> の中の <article> は本文そのものであることが多いので対象にしない。
+    """
+    return next(el.iterancestors(el.tag), None) is not None
+
+
+async def stream_body_text(resp: httpx.Response) -> Optional[str]:
+    """
+    レスポンスを少しずつ読みながら HTML をパースし、本文テキストを抜き出す。
+    十分な長さの <article> / <main> が閉じた時点で残りの読み込みを打ち切る。
+    MAX_HTML_BYTES を超えた分は読まず、そこまでの内容から抜き出す。
+    """
+    parser = None
+    received = 0
+
+    # よくある本文候補（一番外側の <article> / <main>）が閉じたらその場で判定する
+    async for chunk in resp.aiter_bytes(STREAM_CHUNK_SIZE):
+        received += len(chunk)
+        if received > MAX_HTML_BYTES:
+            print(f"[WARN] HTML too large, truncated at {MAX_HTML_BYTES} bytes: {resp.url}")
+            break
+        if parser is None:
+            # ヘッダにも <meta> にも charset が無ければ UTF-8 とみなす
+            # （lxml は指定が無いと Latin-1 として読んでしまうため）
+            encoding = resp.charset_encoding
+            if encoding is None and b"charset" not in chunk[:4096].lower():
+                encoding = "utf-8"
+            parser = etree.HTMLPullParser(
+                events=("end",),
+                tag=("article", "main"),
+                encoding=encoding,
+                remove_comments=True,
+            )
+        parser.feed(chunk)
+        for _, el in parser.read_events():
+            if is_nested_candidate(el):
+                continue
+            text = element_text(el)
+            if len(text) > 200:  # ある程度の長さがあれば本文とみなす
+                return text
+
+    if parser is None:
+        return None
+    root = parser.close()
+    # 閉じタグが無く close() で閉じられた候補もここで拾う
+    for _, el in parser.read_events():
+        if is_nested_candidate(el):
+            continue
+        text = element_text(el)
+        if len(text) > 200:
+            return text
+    if root is None:
         return None
 
-    soup = BeautifulSoup(resp.text, "html.parser")
+    # 木全体をなめるフォールバックは CPU を使うのでスレッドで行う
+    return await asyncio.to_thread(fallback_body_text, root)
 
-    # 不要なタグを削除
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
 
-    # よくある本文候補を優先的に探索
-    candidates = []
-    if soup.find("article"):
-        candidates.append(soup.find("article"))
-    if soup.find("main"):
-        candidates.append(soup.find("main"))
-    candidates += soup.select("[class*='article'], [class*='content']")
+def fallback_body_text(root) -> Optional[str]:
+    """
+    <article> / <main> で本文が見つからなかったときに、
+    class 名が本文っぽい要素 → <body> 全体の順でテキストを抜き出す。
+    """
+    # script / style などは候補ごとではなく木全体から一度だけ取り除く
+    etree.strip_elements(root, *NON_CONTENT_TAGS, with_tail=False)
 
-    for c in candidates:
-        text = c.get_text(separator="\n", strip=True)
-        if text and len(text) > 200:  # ある程度の長さがあれば本文とみなす
+    # class 名が本文っぽい要素を探す
+    for c in CONTENT_CLASS_XPATH(root):
+        text = joined_text(c)
+        if len(text) > 200:
             return text
 
     # 候補がダメなら <body> 全体からテキストだけ抜く
-    body = soup.body or soup
-    text = body.get_text(separator="\n", strip=True)
+    body = root.find("body")
+    if body is None:
+        body = root
+    text = joined_text(body)
     return text or None
 
 
-def save_entry(feed_source: str, entry) -> None:
+async def fetch_article_content(
+    client: httpx.AsyncClient, sem: asyncio.Semaphore, url: str
+) -> Optional[str]:
     """
-    1件のエントリを articles テーブルに保存。
-    同じ URL が既にある場合はスキップする。
+    記事ページの HTML を取得して、本文テキストだけを抜き出す。
+    同時実行数は sem で制限する。失敗した場合は None を返す。
+    429 / 5xx や通信エラーはバックオフを挟んでリトライする。
+
+    本文は enrich_bodies が 1 記事につき 1 回しか取りに行かない
+    （content_text が埋まった行は次回以降対象外）ので、キャッシュはしない。
     """
-    url = getattr(entry, "link", None)
-    title = getattr(entry, "title", None)
+    try:
+        async for attempt in retrying():
+            with attempt:
+                async with sem:
+                    async with client.stream("GET", url) as resp:
+                        resp.raise_for_status()
+                        # 全体を文字列にせず、バイト列のまま少しずつパーサに流す
+                        return await stream_body_text(resp)
+    except Exception as e:
+        print(f"[WARN] fetch_article_content failed: {url} ({e!r})")
+        return None
+
+
+def insert_rows(rows: list) -> list:
+    """
+    rows を articles テーブルにまとめて保存し、新しく挿入された行を返す。
+    url が既にある行は（UNIQUE インデックスにより）DB 側で無視される。
+    """
+    with DB_WRITE_LOCK:
+        res = (
+            supabase.table("articles")
+            .upsert(rows, on_conflict="url", ignore_duplicates=True)
+            .execute()
+        )
+    return res.data
+
+
+def fetch_existing_urls(urls: list) -> set:
+    """
+    urls のうち、articles テーブルに既に存在するものを set で返す。
+    URL はクエリ文字列に入るので、長くなりすぎないよう EXISTING_URL_CHUNK 件ずつ問い合わせる。
+    """
+    found = set()
+    for i in range(0, len(urls), EXISTING_URL_CHUNK):
+        chunk = urls[i : i + EXISTING_URL_CHUNK]
+        existing = supabase.table("articles").select("url").in_("url", chunk).execute()
+        found.update(r["url"] for r in existing.data)
+    return found
+
+
+def update_content_text(article_id, content_text: str) -> None:
+    """
+    articles テーブルの 1 行の content_text を更新する。
+    """
+    with DB_WRITE_LOCK:
+        supabase.table("articles").update({"content_text": content_text}).eq(
+            "id", article_id
+        ).execute()
+
+
+def fetch_rows_without_body(limit: int) -> list:
+    """
+    content_text がまだ入っていない行を、新しい記事から順に最大 limit 件返す。
+    """
+    res = (
+        supabase.table("articles")
+        .select("id, url, summary")
+        .is_("content_text", "null")
+        .order("published_at", desc=True, nullsfirst=False)
+        .order("id", desc=True)
+        .limit(limit)
+        .execute()
+    )
+    return res.data
+
+
+def build_row(feed_source: str, entry, seen: set) -> Optional[dict]:
+    """
+    1件のエントリから articles テーブルに入れる行を作る。
+    フィードに十分な長さの本文が埋め込まれていればそれを content_text にし、
+    そうでなければ後で enrich_bodies が埋めるので None のままにする。
+    同じ URL が既にある（seen に含まれる）場合は None を返す。
+    """
+    url = entry.get("link")
+    title = entry.get("title")
 
     if not url or not title:
         print(f"Skip entry without url/title from {feed_source}")
-        return
+        return None
 
     # RSS 上の要約（抜粋）
-    summary = getattr(entry, "summary", None)
+    summary = entry.get("summary")
 
     # 公開日時
     published_dt = parse_published(entry)
@@ -129,55 +539,244 @@ def save_entry(feed_source: str, entry) -> None:
         published_at = None
 
     # 既存 URL チェック（重複防止）
-    existing = (
-        supabase.table("articles")
-        .select("id")
-        .eq("url", url)
-        .limit(1)
-        .execute()
-    )
-    if existing.data:
-        return
+    if url in seen:
+        return None
+    # 同じフィード内で URL が重複していても 1 行だけにする
+    seen.add(url)
 
-    # 本文テキストを取得（失敗したら None）
-    content_text = fetch_article_content(url)
     # content_raw はいったん summary をそのまま入れておく（既存互換）
     content_raw = summary
 
+    # フィードに全文が入っていれば、記事ページの取得・パースは省く
+    raw = entry.get("content")
+    embedded = raw[0]["value"] if raw else summary
+    content_text = html_to_text(embedded)
+    if len(content_text) <= EMBEDDED_CONTENT_MIN_CHARS:
+        content_text = None
+
     row = {
         "source": feed_source,
         "url": url,
         "title": title,
         "summary": summary,
         "content_raw": content_raw,
-        "content_text": content_text or summary,  # 本文優先、ダメなら要約で埋める
+        "content_text": content_text,
         "published_at": published_at,
     }
+    return row
 
-    res = supabase.table("articles").insert(row).execute()
-    print(f"Inserted: {feed_source} | {title[:60]} ... (id={res.data[0]['id']})")
 
+def build_rows(feed_source: str, entries: list, seen: set) -> tuple:
+    """
+    フィードの全エントリから行を作り、(行のリスト, 失敗したエントリ数) を返す。
+    """
+    rows = []
+    failed = 0
+    for entry in entries:
+        try:
+            row = build_row(feed_source, entry, seen)
+        except Exception as e:
+            print(f"[ERROR] building entry from {feed_source}: {e!r}")
+            failed += 1
+            continue
+        if row is not None:
+            rows.append(row)
+    return rows, failed
 
-def fetch_all() -> None:
+
+async def ingest_metadata(
+    client: httpx.AsyncClient,
+    feed: dict,
+    feed_state: dict,
+    seen_filter: ScalableBloomFilter,
+) -> None:
     """
-    登録された全フィードを巡回して Supabase に保存するメイン処理。
+    1つのフィードを取得し、新規エントリのメタデータだけをまとめて保存する。
+    前回から更新が無い（304）場合は何もしない。
+    保存に成功したら feed_state の ETag / Last-Modified と seen_filter を更新する。
     """
-    for feed in FEEDS:
-        source = feed["source"]
-        url = feed["url"]
+    source = feed["source"]
+    url = feed["url"]
+    prev = feed_state.get(url, {})
 
-        print(f"=== Fetching: {source} ({url}) ===")
-        d = feedparser.parse(url)
+    headers = {}
+    if prev.get("etag"):
+        headers["If-None-Match"] = prev["etag"]
+    if prev.get("modified"):
+        headers["If-Modified-Since"] = prev["modified"]
 
-        entries = getattr(d, "entries", [])
-        print(f" -> {len(entries)} entries")
+    print(f"=== Fetching: {source} ({url}) ===")
+    async for attempt in retrying():
+        with attempt:
+            resp = await client.get(url, headers=headers)
+            if resp.status_code != 304:
+                resp.raise_for_status()
+    if resp.status_code == 304:
+        print(f" -> {source}: not modified")
+        return
+    content = resp.content
+    etag = resp.headers.get("ETag")
+    modified = resp.headers.get("Last-Modified")
+
+    # XML のパースはブロッキングなのでスレッドに逃がす
+    entries = await asyncio.to_thread(
+        parse_feed, content, dict(resp.headers), str(resp.url)
+    )
+    print(f" -> {source}: {len(entries)} entries")
+
+    # Bloom フィルタに載っている URL は保存済みとみなし、残りだけを DB に確認する。
+    # 重複の防止自体は upsert（UNIQUE(url)）が担うので、ここは保存済みの行を
+    # build_row（埋め込み本文のパース）や upsert の送信データから外すためのもの。
+    # フィルタが空のとき（初回や actions/cache が消えたとき）にフィードの全件を
+    # 毎回作り直して送らないよう、フィルタだけに頼らず DB にも問い合わせる。
+    urls = [e["link"] for e in entries if e.get("link")]
+    known = {u for u in urls if u in seen_filter}
+    unknown = [u for u in urls if u not in known]
+    existing = await asyncio.to_thread(fetch_existing_urls, unknown)
+    for u in existing:
+        seen_filter.add(u)
+    seen = known | existing
+
+    # 埋め込み本文の HTML パースがあるのでスレッドに逃がす
+    rows, failed = await asyncio.to_thread(build_rows, source, entries, seen)
+
+    if rows:
+        # 新規行は 1 回の upsert でまとめて保存する（重複は DB 側で弾く）
+        inserted = await asyncio.to_thread(insert_rows, rows)
+        for r in inserted:
+            print(f"Inserted: {source} | {r['title'][:60]} ... (id={r['id']})")
+        for row in rows:
+            seen_filter.add(row["url"])
 
-        for entry in entries:
-            try:
-                save_entry(source, entry)
-            except Exception as e:
-                print(f"[ERROR] saving entry from {source}: {e!r}")
+    # 1 件でも失敗したエントリがあれば、次回 304 で取りこぼさないよう記録しない
+    if failed:
+        print(f" -> {source}: {failed} entries failed, not recording ETag")
+        return
+    # 保存まで終わってから次回用の ETag / Last-Modified を記録する
+    feed_state[url] = {"etag": etag, "modified": modified}
+
+
+async def enrich_row(
+    client: httpx.AsyncClient, sem: asyncio.Semaphore, row: dict
+) -> None:
+    """
+    1行分の記事本文を取得して content_text を埋める。
+    """
+    # 本文テキストを取得（失敗したら None）
+    content_text = await fetch_article_content(client, sem, row["url"])
+    # 本文優先、ダメなら要約で埋める
+    content_text = content_text or row["summary"]
+    if not content_text:
+        # リトライしても取れず要約も無い行は空文字にして、次回以降の対象から外す
+        print(f"[WARN] no body or summary, marking as empty: {row['url']}")
+        content_text = ""
+    await asyncio.to_thread(update_content_text, row["id"], content_text)
+    print(f"Enriched: id={row['id']} ({len(content_text)} chars)")
+
+
+async def enrich_host_row(
+    client: httpx.AsyncClient,
+    sem: asyncio.Semaphore,
+    host_sem: asyncio.Semaphore,
+    row: dict,
+) -> None:
+    """
+    ホストごとの同時実行数（host_sem）を守りながら 1 行分の本文を埋める。
+    """
+    async with host_sem:
+        try:
+            await enrich_row(client, sem, row)
+        except Exception as e:
+            print(f"[ERROR] enriching {row['url']}: {e!r}")
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    接続プール（keep-alive）付きで HTTP/2 を使う共有 AsyncClient を作る。
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        headers=HTTP_HEADERS,
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_TIMEOUT,
+        ),
+        follow_redirects=True,
+    )
+
+
+def use_thread_pool() -> None:
+    """
+    asyncio.to_thread が使うスレッドプールの大きさを揃える。
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=MAX_WORKERS))
+
+
+async def ingest_all() -> None:
+    """
+    全フィードを並列に巡回し、新規記事のメタデータを保存する。
+    """
+    use_thread_pool()
+
+    feed_state = load_feed_state()
+    seen_filter = load_seen_filter()
+    async with create_http_client() as client:
+        results = await asyncio.gather(
+            *[ingest_metadata(client, feed, feed_state, seen_filter) for feed in FEEDS],
+            return_exceptions=True,
+        )
+    for feed, res in zip(FEEDS, results):
+        if isinstance(res, Exception):
+            print(f"[ERROR] fetching feed {feed['source']}: {res!r}")
+    save_feed_state(feed_state)
+    save_seen_filter(seen_filter)
+
+
+async def enrich_bodies() -> None:
+    """
+    content_text が空の記事について、1つの AsyncClient を共有して
+    本文を取得し、テーブルを更新する。
+    全体の同時実行数に加えて、1 ホストあたりの同時実行数も絞る。
+    """
+    use_thread_pool()
+
+    rows = await asyncio.to_thread(fetch_rows_without_body, ENRICH_BATCH_SIZE)
+    print(f"=== Enriching: {len(rows)} articles ===")
+    if not rows:
+        return
+
+    sem = asyncio.Semaphore(MAX_CONCURRENT_ARTICLES)
+    host_sems = defaultdict(lambda: asyncio.Semaphore(MAX_CONCURRENT_PER_HOST))
+    async with create_http_client() as client:
+        await asyncio.gather(
+            *[
+                enrich_host_row(
+                    client, sem, host_sems[urlsplit(row["url"]).netloc], row
+                )
+                for row in rows
+            ]
+        )
+
+
+def fetch_all() -> None:
+    """
+    登録された全フィードを巡回して Supabase に保存し、続けて本文を埋めるメイン処理。
+    """
+    asyncio.run(ingest_all())
+    asyncio.run(enrich_bodies())
 
 
 if __name__ == "__main__":
-    fetch_all()
+    # 引数なし: 両方 / ingest: メタデータのみ / enrich: 本文の取得のみ
+    command = sys.argv[1] if len(sys.argv) > 1 else "all"
+    if command == "ingest":
+        asyncio.run(ingest_all())
+    elif command == "enrich":
+        asyncio.run(enrich_bodies())
+    elif command == "all":
+        fetch_all()
+    else:
+        sys.exit(f"unknown command: {command} (expected ingest / enrich / all)")
@@ -0,0 +1,10 @@
+-- articles.url を一意にして、重複チェックを DB 側に任せる
+-- （ai_news_fetcher.py の upsert(on_conflict="url") が前提としている）
+
+-- 既存の重複行は最も古い id だけ残して削除する
+DELETE FROM articles a
+USING articles b
+WHERE a.url = b.url
+  AND a.id > b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS articles_url_uniq ON articles (url);
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# ai_news_fetcher はインポート時に Supabase クライアントを作るのでダミーの値を入れておく
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "dummy")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
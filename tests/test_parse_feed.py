@@ -0,0 +1,82 @@
+from pathlib import Path
+
+import feedparser
+import pytest
+
+import ai_news_fetcher
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def load(name: str) -> bytes:
+    return (FIXTURES / name).read_bytes()
+
+
+@pytest.mark.parametrize("name", ["rss20.xml", "rss10.xml", "atom.xml"])
+def test_matches_feedparser(name):
+    content = load(name)
+    ours = ai_news_fetcher.parse_feed_xml(content)
+    theirs = feedparser.parse(content).entries
+
+    assert len(ours) == len(theirs)
+    for o, t in zip(ours, theirs):
+        assert o["link"] == t.get("link")
+        assert o["title"] == t.get("title")
+        assert o["summary"] == t.get("summary")
+        # published / updated の振り分けは違ってよいが、保存される日時は同じになること
+        assert ai_news_fetcher.parse_published(o) == ai_news_fetcher.parse_published(t)
+
+
+def test_rss20_guid_permalink_used_as_link():
+    entries = ai_news_fetcher.parse_feed_xml(load("rss20.xml"))
+
+    # isPermaLink="false" の guid は link より優先しない
+    assert entries[0]["link"] == "https://example.com/posts/1"
+    assert entries[1]["link"] == "https://example.com/posts/2"
+
+
+def test_rss20_content_encoded_fills_summary():
+    entry = ai_news_fetcher.parse_feed_xml(load("rss20.xml"))[2]
+
+    assert entry["content"] == [{"value": "<p>Full body of the third post</p>"}]
+    assert entry["summary"] == "<p>Full body of the third post</p>"
+
+
+def test_rss10_items():
+    (entry,) = ai_news_fetcher.parse_feed_xml(load("rss10.xml"))
+
+    assert entry["link"] == "https://example.jp/entry/1"
+    assert entry["title"] == "日本語のタイトル"
+    assert entry["summary"] == "日本語の要約"
+    assert entry["published_parsed"][:6] == (2025, 6, 10, 0, 30, 0)
+
+
+def test_atom_alternate_link_and_content_summary():
+    first, second = ai_news_fetcher.parse_feed_xml(load("atom.xml"))
+
+    assert first["link"] == "https://example.org/posts/1"
+    assert first["summary"] == "Atom summary"
+    assert second["link"] == "https://example.org/posts/2"
+    assert second["summary"] == "<p>Atom content only</p>"
+
+
+def test_malformed_feed_falls_back_to_feedparser():
+    content = b"<rss><channel><item><title>A&nbsp;B</title><link>https://a</link></item></channel></rss>"
+
+    entries = ai_news_fetcher.parse_feed(content, {}, "https://example.com/feed")
+
+    assert [e["link"] for e in entries] == ["https://a"]
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"<rss><channel><item><title>A</title><link>/posts/1</link></item></channel></rss>",
+        # 壊れた XML（feedparser へのフォールバック経路）
+        b"<rss><channel><item><title>A&nbsp;</title><link>/posts/1</link></item></channel></rss>",
+    ],
+)
+def test_relative_links_resolved_against_feed_url(content):
+    entries = ai_news_fetcher.parse_feed(content, {}, "https://example.com/blog/feed.xml")
+
+    assert entries[0]["link"] == "https://example.com/posts/1"
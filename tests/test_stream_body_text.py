@@ -0,0 +1,65 @@
+import asyncio
+
+import httpx
+
+import ai_news_fetcher
+
+
+def extract(html: bytes) -> str:
+    async def run():
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=html))
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with client.stream("GET", "https://example.com/") as resp:
+                return await ai_news_fetcher.stream_body_text(resp)
+
+    return asyncio.run(run())
+
+
+def test_outermost_article_wins_over_nested_card():
+    card = "related card " * 30
+    body = "main story " * 30
+    html = (
+        f"<html><body><article><h1>Title</h1><p>{body}</p>"
+        f"<article>{card}</article></article></body></html>"
+    ).encode()
+
+    text = extract(html)
+
+    assert text.startswith("Title\nmain story")
+
+
+def test_article_inside_main_wins_over_main():
+    body = "main story " * 30
+    aside = "related link " * 30
+    html = (
+        f"<html><body><main><article><p>{body}</p></article>"
+        f"<aside>{aside}</aside></main></body></html>"
+    ).encode()
+
+    text = extract(html)
+
+    assert text.startswith("main story")
+    assert "related link" not in text
+
+
+def test_script_and_style_are_excluded():
+    html = (
+        "<html><body><main><script>var x = 1;</script><style>p {}</style>"
+        f"<p>{'本文 ' * 100}</p></main></body></html>"
+    ).encode()
+
+    text = extract(html)
+
+    assert "var x" not in text
+    assert "p {}" not in text
+    assert text.startswith("本文")
+
+
+def test_falls_back_to_content_class_then_body():
+    html = (
+        "<html><body><nav>menu</nav>"
+        f"<div class='post-content'>{'content ' * 50}</div></body></html>"
+    ).encode()
+
+    assert extract(html).startswith("content")
+    assert extract(b"<html><body><p>short</p></body></html>") == "short"